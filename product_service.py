@@ -3,9 +3,34 @@
 
 # We use 'http.server' to create a simple web server
 # and 'json' to format our data to be sent over the web.
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import json
+import logging
 import os
+import re
+import sys
+import threading
+import time
+
+# Key: Use orjson when it is installed – it is a C serializer that works on bytes
+# directly, so responses skip the str -> bytes encode and requests skip the decode.
+# Falls back to the standard library so the service still has no hard dependencies.
+# dumps() is always called without options (no sorting or indentation): that is
+# orjson's fastest path. The fallback is just as compact but keeps json's default
+# ASCII escaping, so strings that json.loads accepts (even a lone surrogate such
+# as "\ud800") can always be encoded again.
+try:
+    import orjson
+    dumps = orjson.dumps
+    loads = orjson.loads
+except ImportError:
+    def dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('ascii')
+    loads = json.loads
+
+# Key: Per-request logging goes through 'logging' at DEBUG level, so it costs
+# nothing unless enabled (e.g. logging.basicConfig(level=logging.DEBUG)).
+logger = logging.getLogger(__name__)
 
 # Key: In-memory data store
 # In real apps, this would be a real database (e.g., Postgres/Mongo).
@@ -14,8 +39,8 @@ def load_products():
     """Load products from the JSON data file."""
     data_file = os.path.join(os.path.dirname(__file__), 'products_data.json')
     try:
-        with open(data_file, 'r') as f:
-            return json.load(f)
+        with open(data_file, 'rb') as f:
+            return loads(f.read())
     except FileNotFoundError:
         print(f"Warning: {data_file} not found. Starting with empty product list.")
         return {}
@@ -25,194 +50,318 @@ def load_products():
 
 products = load_products()
 
+# Key: Each product is also kept pre-encoded as JSON bytes, so reads never
+# re-serialize it; writes pay for one dumps() of the changed product instead.
+products_json = {product_id: dumps(product) for product_id, product in products.items()}
+
+# Key: Requests are handled on several threads at once, so every access to the
+# shared state below (products, products_json, the ID counter and the cached
+# product list) holds this lock.
+# Request bodies are read before taking it and responses are written after
+# releasing it, so a slow client cannot stall others.
+_lock = threading.Lock()
+
+# Key: Next product ID, computed once at startup. IDs are never reused after a delete.
+_next_id = (max(map(int, products)) + 1) if products else 1
+
+# Key: Encoded body of GET /products, rebuilt on the first read after a write
+_all_products_json = None
+
+def _save_product(product_id, product):
+    """Store a product and its encoded form. The caller must hold _lock."""
+    global _all_products_json
+    # Encode first: if dumps() fails, neither map has been changed
+    encoded = dumps(product)
+    products[product_id] = product
+    products_json[product_id] = encoded
+    _all_products_json = None
+
+def _remove_product(product_id):
+    """Remove a product and its encoded form. The caller must hold _lock."""
+    global _all_products_json
+    del products[product_id]
+    del products_json[product_id]
+    _all_products_json = None
+
+# Key: Fixed error responses, encoded once at startup and sent as-is
+_NOT_FOUND_ERROR = dumps({"error": "Product not found"})
+_ENDPOINT_ERROR = dumps({"error": "Endpoint not found"})
+_JSON_ERROR = dumps({"error": "Invalid JSON payload"})
+_OBJECT_ERROR = dumps({"error": "JSON payload must be an object"})
+_CONTENT_LENGTH_ERROR = dumps({"error": "Invalid Content-Length header"})
+_LENGTH_REQUIRED_ERROR = dumps({"error": "Transfer-Encoding is not supported; send Content-Length"})
+_NAME_ERROR = dumps({"error": "Field 'name' is required and must be a non-empty string"})
+_PRICE_ERROR = dumps({"error": "Field 'price' is required and must be a non-negative number"})
+
+# Key: Field validators shared by POST, PUT and PATCH.
+# Each returns the encoded error body for an invalid value, or None if it is valid.
+
+def _validate_name(name):
+    return None if isinstance(name, str) and name.strip() else _NAME_ERROR
+
+def _validate_price(price):
+    return None if isinstance(price, (int, float)) and price >= 0 else _PRICE_ERROR
+
 # Key: HTTP request handler – maps HTTP methods to Python methods
 class ProductServiceHandler(BaseHTTPRequestHandler):
-    
+    # Key: HTTP/1.1 keeps connections open between requests (keep-alive), so
+    # clients don't pay a new TCP handshake per request. Idle connections are
+    # dropped after 'timeout' seconds so they don't pin a server thread forever.
+    protocol_version = 'HTTP/1.1'
+    timeout = 30
+    # Key: Send small responses right away instead of letting Nagle's algorithm
+    # hold them back on a kept-alive connection (sets TCP_NODELAY).
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Send the built-in access log to the DEBUG logger instead of stderr."""
+        logger.debug(format, *args)
+
     def _send_response(self, status_code, data):
         """Helper function to send a JSON response."""
         # Key: Central place to set status, headers, and write JSON body
-        self.send_response(status_code)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode('utf-8'))
+        self._send_raw(status_code, dumps(data))
+
+    # Key: Pre-encoded status line and fixed headers, built on first use. The
+    # dict is shared with subclasses, which may change protocol_version or
+    # server_version, so entries are keyed on (handler class, status code).
+    _response_heads = {}
+    # Key: Encoded Date header value, refreshed at most once per second
+    _date = (0, b'')
+
+    def _send_raw(self, status_code, body):
+        """Send an already-encoded JSON body."""
+        # Key: Status line, headers and body are sent in a single write; only
+        # Date, Content-Length and Connection vary between responses.
+        # Both caches are shared class state, so they are always accessed
+        # through ProductServiceHandler.
+        key = (type(self), status_code)
+        head = ProductServiceHandler._response_heads.get(key)
+        if head is None:
+            head = ProductServiceHandler._response_heads[key] = (
+                f"{self.protocol_version} {status_code} {self.responses[status_code][0]}\r\n"
+                f"Server: {self.version_string()}\r\n"
+                "Content-Type: application/json\r\n"
+            ).encode('latin-1')
+
+        now = int(time.time())
+        if ProductServiceHandler._date[0] != now:
+            ProductServiceHandler._date = (now, self.date_time_string(now).encode('latin-1'))
+
+        self.wfile.write(b''.join((
+            head,
+            b'Date: ', ProductServiceHandler._date[1],
+            b'\r\nContent-Length: ', b'%d' % len(body),
+            b'\r\nConnection: close\r\n\r\n' if self.close_connection else b'\r\nConnection: keep-alive\r\n\r\n',
+            body,
+        )))
+        self.log_request(status_code)
+
+    def _content_length(self):
+        """Return the request's Content-Length: 0 if it is missing, None if it is invalid."""
+        values = self.headers.get_all('Content-Length')
+        if not values:
+            return 0
+        # Key: Only plain digits are accepted (int() alone would also take '-1',
+        # '+1' or '1_0'), and repeated headers must all agree.
+        values = {value.strip() for value in values}
+        if len(values) != 1:
+            return None
+        value = values.pop()
+        return int(value) if value.isascii() and value.isdigit() else None
+
+    def _dispatch(self, method):
+        """Route the request to the first handler whose method and path match."""
+        # Key: Router – one table lookup instead of per-method path checks
+        logger.debug("Received %s request for path: %s", method, self.path)
+
+        # Key: Always consume the request body, even for routes that ignore it,
+        # so the next request on a kept-alive connection starts at the right byte.
+        # Key: Without a valid length the end of the body is unknown, so the
+        # bytes after the headers can't be trusted as the next request.
+        # Chunked bodies aren't decoded, so they are treated the same way:
+        # the request is rejected and the connection is closed.
+        if 'Transfer-Encoding' in self.headers:
+            self.close_connection = True
+            self._send_raw(411, _LENGTH_REQUIRED_ERROR)
+            return
+        content_length = self._content_length()
+        if content_length is None:
+            self.close_connection = True
+            self._send_raw(400, _CONTENT_LENGTH_ERROR)
+            return
+        self.raw_body = self.rfile.read(content_length) if content_length > 0 else b''
+
+        for route_method, pattern, handler in self.ROUTES:
+            if route_method == method:
+                match = pattern.match(self.path)
+                if match:
+                    handler(self, *match.groups())
+                    return
 
-    # A request handler for GET requests.
-    def do_GET(self):
-        """Handles GET requests to the service."""
-        print(f"Received GET request for path: {self.path}")
-
-        # Endpoint 1: Get all products
-        # Key: Simple router via path checks
-        # If the path is '/products', return the whole list.
-        if self.path == '/products':
-            self._send_response(200, list(products.values()))
-            
-        # Endpoint 2: Get a single product by ID
-        # If the path looks like '/products/1', '/products/2', etc.
-        elif self.path.startswith('/products/'):
-            # Extract the ID from the path.
-            try:
-                product_id = self.path.split('/')[-1]
-                
-                # Check if the product exists in our "database".
-                if product_id in products:
-                    self._send_response(200, products[product_id])
-                else:
-                    # If not found, send a 404 error.
-                    error_message = {"error": "Product not found"}
-                    self._send_response(404, error_message)
-            except Exception as e:
-                error_message = {"error": f"Invalid request: {e}"}
-                self._send_response(400, error_message)
-        
         # If the path is not recognized, send a 404 error.
-        else:
-            error_message = {"error": "Endpoint not found"}
-            self._send_response(404, error_message)
+        self._send_raw(404, _ENDPOINT_ERROR)
+
+    def do_GET(self):
+        self._dispatch('GET')
 
-    # A request handler for POST requests.
     def do_POST(self):
-        """Handles POST requests to create a new product."""
-        # Key: Create – validate input, assign new ID, return 201
-        print(f"Received POST request for path: {self.path}")
-
-        if self.path == '/products':
-            try:
-                content_length_header = self.headers.get('Content-Length', '0')
-                content_length = int(content_length_header) if content_length_header.isdigit() else 0
-                raw_body = self.rfile.read(content_length) if content_length > 0 else b''
-
-                # Parse JSON body
-                try:
-                    payload = json.loads(raw_body.decode('utf-8') or '{}')
-                except json.JSONDecodeError:
-                    self._send_response(400, {"error": "Invalid JSON payload"})
-                    return
+        self._dispatch('POST')
 
-                name = payload.get('name')
-                price = payload.get('price')
+    def do_PUT(self):
+        self._dispatch('PUT')
 
-                # Basic validation
-                if not isinstance(name, str) or not name.strip():
-                    self._send_response(400, {"error": "Field 'name' is required and must be a non-empty string"})
-                    return
-                if not (isinstance(price, int) or isinstance(price, float)) or price < 0:
-                    self._send_response(400, {"error": "Field 'price' is required and must be a non-negative number"})
-                    return
+    def do_PATCH(self):
+        self._dispatch('PATCH')
 
-                # Generate new ID
-                if products:
-                    max_id = max(int(pid) for pid in products.keys())
-                    new_id = str(max_id + 1)
-                else:
-                    new_id = '1'
+    def do_DELETE(self):
+        self._dispatch('DELETE')
 
-                # Store the new product
-                products[new_id] = {"name": name.strip(), "price": price}
+    # Endpoint 1: Get all products
+    def list_products(self):
+        """Handles GET /products."""
+        global _all_products_json
+        with _lock:
+            if _all_products_json is None:
+                _all_products_json = b'[' + b','.join(products_json.values()) + b']'
+            body = _all_products_json
+        self._send_raw(200, body)
 
-                # Respond with created resource
-                created = {"id": new_id, "name": products[new_id]["name"], "price": products[new_id]["price"]}
-                self._send_response(201, created)
-            except Exception as e:
-                self._send_response(500, {"error": f"Internal server error: {e}"})
+    # Endpoint 2: Get a single product by ID, e.g. '/products/1'
+    def get_product(self, product_id):
+        """Handles GET /products/{id}."""
+        with _lock:
+            body = products_json.get(product_id)
+        # Check if the product exists in our "database".
+        if body is not None:
+            self._send_raw(200, body)
         else:
-            error_message = {"error": "Endpoint not found"}
-            self._send_response(404, error_message)
+            # If not found, send a 404 error.
+            self._send_raw(404, _NOT_FOUND_ERROR)
 
-    def _read_json_body(self):
-        # Key: Safely read and parse JSON from request body
-        content_length_header = self.headers.get('Content-Length', '0')
-        content_length = int(content_length_header) if content_length_header.isdigit() else 0
-        raw_body = self.rfile.read(content_length) if content_length > 0 else b''
+    def create_product(self):
+        """Handles POST /products to create a new product."""
+        # Key: Create – validate input, assign new ID, return 201
+        global _next_id
         try:
-            return json.loads(raw_body.decode('utf-8') or '{}'), None
-        except json.JSONDecodeError:
-            return None, {"error": "Invalid JSON payload"}
-
-    def do_PUT(self):
-        """Handles PUT requests to fully update an existing product."""
-        # Key: Full update – requires both name and price
-        print(f"Received PUT request for path: {self.path}")
-        if self.path.startswith('/products/'):
-            product_id = self.path.split('/')[-1]
-            if product_id not in products:
-                self._send_response(404, {"error": "Product not found"})
-                return
-
+            # Parse JSON body
             payload, error = self._read_json_body()
             if error is not None:
-                self._send_response(400, error)
+                self._send_raw(400, error)
                 return
 
             name = payload.get('name')
             price = payload.get('price')
 
-            # PUT requires both fields
-            if not isinstance(name, str) or not name.strip():
-                self._send_response(400, {"error": "Field 'name' is required and must be a non-empty string"})
-                return
-            if not (isinstance(price, int) or isinstance(price, float)) or price < 0:
-                self._send_response(400, {"error": "Field 'price' is required and must be a non-negative number"})
+            # Basic validation
+            error = _validate_name(name) or _validate_price(price)
+            if error:
+                self._send_raw(400, error)
                 return
 
-            products[product_id] = {"name": name.strip(), "price": price}
-            updated = {"id": product_id, "name": products[product_id]["name"], "price": products[product_id]["price"]}
-            self._send_response(200, updated)
-        else:
-            self._send_response(404, {"error": "Endpoint not found"})
+            with _lock:
+                # Generate new ID and store the new product; the counter only
+                # moves on once the product has been saved
+                new_id = str(_next_id)
+                _save_product(new_id, {"name": name.strip(), "price": price})
+                _next_id += 1
+                created = {"id": new_id, "name": products[new_id]["name"], "price": products[new_id]["price"]}
 
-    def do_PATCH(self):
-        """Handles PATCH requests to partially update an existing product."""
-        # Key: Partial update – validates only provided fields
-        print(f"Received PATCH request for path: {self.path}")
-        if self.path.startswith('/products/'):
-            product_id = self.path.split('/')[-1]
-            if product_id not in products:
-                self._send_response(404, {"error": "Product not found"})
-                return
+            # Respond with created resource
+            self._send_response(201, created)
+        except Exception as e:
+            self._send_response(500, {"error": f"Internal server error: {e}"})
 
-            payload, error = self._read_json_body()
-            if error is not None:
-                self._send_response(400, error)
-                return
+    def _read_json_body(self):
+        # Key: Safely parse JSON from the request body read by _dispatch.
+        # Valid JSON that isn't an object (e.g. a list) is rejected as well.
+        try:
+            payload = loads(self.raw_body or b'{}')
+        except json.JSONDecodeError:
+            return None, _JSON_ERROR
+        if not isinstance(payload, dict):
+            return None, _OBJECT_ERROR
+        return payload, None
 
-            # Validate provided fields only
-            if 'name' in payload:
-                name = payload.get('name')
-                if not isinstance(name, str) or not name.strip():
-                    self._send_response(400, {"error": "Field 'name' is required and must be a non-empty string"})
-                    return
-                products[product_id]["name"] = name.strip()
+    def replace_product(self, product_id):
+        """Handles PUT /products/{id} to fully update an existing product."""
+        # Key: Full update – requires both name and price
+        payload, error = self._read_json_body()
+        if error is None:
+            name = payload.get('name')
+            price = payload.get('price')
 
-            if 'price' in payload:
-                price = payload.get('price')
-                if not (isinstance(price, int) or isinstance(price, float)) or price < 0:
-                    self._send_response(400, {"error": "Field 'price' is required and must be a non-negative number"})
-                    return
-                products[product_id]["price"] = price
+            # PUT requires both fields
+            error = _validate_name(name) or _validate_price(price)
 
-            updated = {"id": product_id, "name": products[product_id]["name"], "price": products[product_id]["price"]}
-            self._send_response(200, updated)
-        else:
-            self._send_response(404, {"error": "Endpoint not found"})
+        # Key: Only the lookup and the update hold the lock; the response is
+        # written after releasing it. A missing product is reported before a bad body.
+        with _lock:
+            if product_id not in products:
+                status, body = 404, _NOT_FOUND_ERROR
+            elif error is not None:
+                status, body = 400, error
+            else:
+                _save_product(product_id, {"name": name.strip(), "price": price})
+                status, body = 200, dumps({"id": product_id, "name": products[product_id]["name"], "price": products[product_id]["price"]})
+        self._send_raw(status, body)
 
-    def do_DELETE(self):
-        """Handles DELETE requests to remove an existing product."""
-        # Key: Delete – returns deleted resource or 404 if not found
-        print(f"Received DELETE request for path: {self.path}")
-        if self.path.startswith('/products/'):
-            product_id = self.path.split('/')[-1]
+    def update_product(self, product_id):
+        """Handles PATCH /products/{id} to partially update an existing product."""
+        # Key: Partial update – validates only provided fields
+        payload, error = self._read_json_body()
+        if error is None:
+            # Validate provided fields only, before changing anything
+            name = payload.get('name')
+            price = payload.get('price')
+            error = ('name' in payload and _validate_name(name)) or ('price' in payload and _validate_price(price))
+
+        with _lock:
             if product_id not in products:
-                self._send_response(404, {"error": "Product not found"})
-                return
+                status, body = 404, _NOT_FOUND_ERROR
+            elif error:
+                status, body = 400, error
+            else:
+                # Build a new dict so the stored product is untouched if saving fails
+                product = dict(products[product_id])
+                if 'name' in payload:
+                    product["name"] = name.strip()
+                if 'price' in payload:
+                    product["price"] = price
+                _save_product(product_id, product)
+                status, body = 200, dumps({"id": product_id, "name": product["name"], "price": product["price"]})
+        self._send_raw(status, body)
 
-            deleted = {"id": product_id, "name": products[product_id]["name"], "price": products[product_id]["price"]}
-            del products[product_id]
-            self._send_response(200, deleted)
+    def delete_product(self, product_id):
+        """Handles DELETE /products/{id} to remove an existing product."""
+        # Key: Delete – returns deleted resource or 404 if not found
+        with _lock:
+            product = products.get(product_id)
+            if product is not None:
+                _remove_product(product_id)
+        if product is None:
+            self._send_raw(404, _NOT_FOUND_ERROR)
         else:
-            self._send_response(404, {"error": "Endpoint not found"})
+            self._send_response(200, {"id": product_id, "name": product["name"], "price": product["price"]})
+
+    # Key: Routing table, compiled once – (HTTP method, path pattern, handler).
+    # Captured groups from the pattern are passed to the handler as arguments.
+    ROUTES = [
+        ('GET', re.compile(r'^/products$'), list_products),
+        ('GET', re.compile(r'^/products/([^/]+)$'), get_product),
+        ('POST', re.compile(r'^/products$'), create_product),
+        ('PUT', re.compile(r'^/products/([^/]+)$'), replace_product),
+        ('PATCH', re.compile(r'^/products/([^/]+)$'), update_product),
+        ('DELETE', re.compile(r'^/products/([^/]+)$'), delete_product),
+    ]
+
+# Key: ThreadingHTTPServer keeps socketserver's listen backlog of 5. When more
+# clients connect at once, the kernel drops the extra connection attempts and
+# those clients wait about a second to retry, so the backlog is raised.
+class ProductServiceServer(ThreadingHTTPServer):
+    request_queue_size = 64
 
-def run(server_class=HTTPServer, handler_class=ProductServiceHandler, port=8000):
+def run(server_class=ProductServiceServer, handler_class=ProductServiceHandler, port=8000):
     """Starts the HTTP server."""
     # Key: Server bootstrap – binds to port and serves forever
     server_address = ('', port)
@@ -223,5 +372,5 @@ def run(server_class=HTTPServer, handler_class=ProductServiceHandler, port=8000)
 # This is the entry point of our script.
 # When you run 'python product_service.py', this part will execute.
 if __name__ == '__main__':
-    # Key: Entry point – run with `python product_service.py`
-    run()
\ No newline at end of file
+    # Key: Entry point – run with `python product_service.py [port]` (default 8000)
+    run(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
\ No newline at end of file
@@ -1,239 +1,355 @@
 
 # test_product_service.py
-# Key: This file uses Python's built-in unittest to exercise the HTTP API.
-# Tests make real HTTP requests to the running service using the 'requests' library.
+# Key: This file uses pytest to exercise the HTTP API.
+# Tests run the service in a background thread of the test process and make
+# real HTTP requests to it using the 'requests' library.
+# Each function whose name starts with 'test_' is an independent test case;
+# they assert on HTTP status codes and JSON response bodies.
+# Tests only change products they created themselves, so they can run in
+# parallel with pytest-xdist (python -m pytest -n auto).
 
-import unittest
+import pytest
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import http.client
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Key: Base URL for all requests; the service must be running on this port.
-BASE_URL = "http://localhost:8000"
-
-class TestProductService(unittest.TestCase):
-    # Key: Each method whose name starts with 'test_' is an independent test case.
-    # They assert on HTTP status codes and JSON response bodies.
-
-    def test_get_all_products(self):
-        # Key: Smoke test for the collection endpoint
-        """Test the /products endpoint to get all products."""
-        response = requests.get(f"{BASE_URL}/products")
-        
-        # Check if the status code is 200 (OK)
-        self.assertEqual(response.status_code, 200)
-        
-        # Check if the response is a list with at least the original 3 items
-        products = response.json()
-        self.assertIsInstance(products, list)
-        self.assertGreaterEqual(len(products), 3)
-        print("\nTest 'get_all_products' PASSED")
-
-    def test_get_one_product_success(self):
-        # Key: Fetch a known product by ID
-        """Test getting a single, existing product by its ID."""
-        response = requests.get(f"{BASE_URL}/products/1")
-        
-        # Check for status 200 (OK)
-        self.assertEqual(response.status_code, 200)
-        
-        # Check if the product name is correct
-        product = response.json()
-        self.assertEqual(product['name'], 'Laptop')
-        print("Test 'get_one_product_success' PASSED")
-
-    def test_get_one_product_not_found(self):
-        # Key: Not-found path should return 404 with error JSON
-        """Test getting a product that does not exist."""
-        response = requests.get(f"{BASE_URL}/products/99") # 99 is a non-existent ID
-        
-        # Check for status 404 (Not Found)
-        self.assertEqual(response.status_code, 404)
-        
-        # Check the error message
-        error_data = response.json()
-        self.assertEqual(error_data['error'], 'Product not found')
-        print("Test 'get_one_product_not_found' PASSED")
-        
-    def test_invalid_endpoint(self):
-        # Key: Unknown route should return 404
-        """Test accessing an endpoint that doesn't exist."""
-        response = requests.get(f"{BASE_URL}/invalid_path")
-        
-        # Check for status 404 (Not Found)
-        self.assertEqual(response.status_code, 404)
-        print("Test 'invalid_endpoint' PASSED")
-
-    def test_create_product(self):
-        # Key: Happy-path creation returns 201 and echoes fields with a new id
-        """Test creating a new product using POST /products."""
-        new_product = {"name": "Headphones", "price": 199}
-        response = requests.post(f"{BASE_URL}/products", json=new_product)
-
-        # Expect 201 Created
-        self.assertEqual(response.status_code, 201)
-
-        created = response.json()
-        self.assertIn('id', created)
-        self.assertEqual(created['name'], new_product['name'])
-        self.assertEqual(created['price'], new_product['price'])
-        print("Test 'create_product' PASSED")
-
-    def test_create_product_invalid_json(self):
-        # Key: Malformed JSON should be rejected with 400 and clear error
-        """POST /products with invalid JSON should return 400."""
-        response = requests.post(
-            f"{BASE_URL}/products",
-            data="{invalid json}",
-            headers={"Content-Type": "application/json"}
-        )
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(response.json().get('error'), 'Invalid JSON payload')
-        print("Test 'create_product_invalid_json' PASSED")
-
-    def test_create_product_missing_name(self):
-        # Key: Validation - 'name' is required and must be non-empty
-        """POST /products without name should return 400."""
-        payload = {"price": 10}
-        response = requests.post(f"{BASE_URL}/products", json=payload)
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json().get('error'),
-            "Field 'name' is required and must be a non-empty string"
-        )
-        print("Test 'create_product_missing_name' PASSED")
-
-    def test_create_product_empty_name(self):
-        # Key: Validation - whitespace-only name is not allowed
-        """POST /products with empty name should return 400."""
-        payload = {"name": "   ", "price": 10}
-        response = requests.post(f"{BASE_URL}/products", json=payload)
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json().get('error'),
-            "Field 'name' is required and must be a non-empty string"
-        )
-        print("Test 'create_product_empty_name' PASSED")
-
-    def test_create_product_missing_price(self):
-        # Key: Validation - 'price' is required
-        """POST /products without price should return 400."""
-        payload = {"name": "Item"}
-        response = requests.post(f"{BASE_URL}/products", json=payload)
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json().get('error'),
-            "Field 'price' is required and must be a non-negative number"
-        )
-        print("Test 'create_product_missing_price' PASSED")
-
-    def test_create_product_non_numeric_price(self):
-        # Key: Validation - 'price' must be numeric
-        """POST /products with non-numeric price should return 400."""
-        payload = {"name": "Item", "price": "free"}
-        response = requests.post(f"{BASE_URL}/products", json=payload)
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json().get('error'),
-            "Field 'price' is required and must be a non-negative number"
-        )
-        print("Test 'create_product_non_numeric_price' PASSED")
-
-    def test_create_product_negative_price(self):
-        # Key: Validation - 'price' cannot be negative
-        """POST /products with negative price should return 400."""
-        payload = {"name": "Item", "price": -1}
-        response = requests.post(f"{BASE_URL}/products", json=payload)
-        self.assertEqual(response.status_code, 400)
-        self.assertEqual(
-            response.json().get('error'),
-            "Field 'price' is required and must be a non-negative number"
-        )
-        print("Test 'create_product_negative_price' PASSED")
-
-    def test_put_update_product(self):
-        # Key: PUT is a full replacement; requires both fields
-        """Create a product, then fully update it via PUT."""
-        create_resp = requests.post(f"{BASE_URL}/products", json={"name": "Temp", "price": 10})
-        self.assertEqual(create_resp.status_code, 201)
-        product_id = create_resp.json()["id"]
-
-        put_resp = requests.put(f"{BASE_URL}/products/{product_id}", json={"name": "Updated", "price": 20})
-        self.assertEqual(put_resp.status_code, 200)
-        body = put_resp.json()
-        self.assertEqual(body["id"], product_id)
-        self.assertEqual(body["name"], "Updated")
-        self.assertEqual(body["price"], 20)
-        print("Test 'put_update_product' PASSED")
-
-    def test_put_missing_fields(self):
-        # Key: PUT without one of the required fields should be 400
-        """PUT requires both name and price."""
-        create_resp = requests.post(f"{BASE_URL}/products", json={"name": "Temp2", "price": 15})
-        self.assertEqual(create_resp.status_code, 201)
-        product_id = create_resp.json()["id"]
-
-        resp1 = requests.put(f"{BASE_URL}/products/{product_id}", json={"name": "OnlyName"})
-        self.assertEqual(resp1.status_code, 400)
-        resp2 = requests.put(f"{BASE_URL}/products/{product_id}", json={"price": 999})
-        self.assertEqual(resp2.status_code, 400)
-        print("Test 'put_missing_fields' PASSED")
-
-    def test_patch_partial_update(self):
-        # Key: PATCH can update one field at a time
-        """PATCH should allow updating only one field at a time."""
-        create_resp = requests.post(f"{BASE_URL}/products", json={"name": "Patchable", "price": 30})
-        self.assertEqual(create_resp.status_code, 201)
-        product_id = create_resp.json()["id"]
-
-        patch_resp = requests.patch(f"{BASE_URL}/products/{product_id}", json={"price": 35})
-        self.assertEqual(patch_resp.status_code, 200)
-        self.assertEqual(patch_resp.json()["price"], 35)
-
-        patch_resp2 = requests.patch(f"{BASE_URL}/products/{product_id}", json={"name": "Patched"})
-        self.assertEqual(patch_resp2.status_code, 200)
-        self.assertEqual(patch_resp2.json()["name"], "Patched")
-        print("Test 'patch_partial_update' PASSED")
-
-    def test_patch_validation(self):
-        # Key: PATCH still validates any provided fields
-        """PATCH validation for name/price values."""
-        create_resp = requests.post(f"{BASE_URL}/products", json={"name": "Patchable2", "price": 40})
-        self.assertEqual(create_resp.status_code, 201)
-        product_id = create_resp.json()["id"]
-
-        resp1 = requests.patch(f"{BASE_URL}/products/{product_id}", json={"name": "   "})
-        self.assertEqual(resp1.status_code, 400)
-        resp2 = requests.patch(f"{BASE_URL}/products/{product_id}", json={"price": -5})
-        self.assertEqual(resp2.status_code, 400)
-        resp3 = requests.patch(f"{BASE_URL}/products/{product_id}", json={"price": "free"})
-        self.assertEqual(resp3.status_code, 400)
-        print("Test 'patch_validation' PASSED")
-
-    def test_delete_product_success(self):
-        # Key: DELETE returns the deleted resource; subsequent GET is 404
-        """Create a product, delete it, and verify it is gone."""
-        create_resp = requests.post(f"{BASE_URL}/products", json={"name": "ToDelete", "price": 5})
-        self.assertEqual(create_resp.status_code, 201)
-        product_id = create_resp.json()["id"]
-
-        delete_resp = requests.delete(f"{BASE_URL}/products/{product_id}")
-        self.assertEqual(delete_resp.status_code, 200)
-        body = delete_resp.json()
-        self.assertEqual(body["id"], product_id)
-
-        # Subsequent GET should be 404
-        get_resp = requests.get(f"{BASE_URL}/products/{product_id}")
-        self.assertEqual(get_resp.status_code, 404)
-        print("Test 'delete_product_success' PASSED")
-
-    def test_delete_product_not_found(self):
-        # Key: Deleting a missing product yields 404 with error JSON
-        """Deleting a non-existent product returns 404."""
-        delete_resp = requests.delete(f"{BASE_URL}/products/999999")
-        self.assertEqual(delete_resp.status_code, 404)
-        self.assertEqual(delete_resp.json().get('error'), 'Product not found')
-        print("Test 'delete_product_not_found' PASSED")
-
-# This allows running the tests from the command line.
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+from product_service import ProductServiceHandler, ProductServiceServer
+
+# Key: Decode response bodies with orjson when it is installed (like the service does)
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+def parse_json(response):
+    """Decode a response's JSON body straight from its raw bytes."""
+    return _loads(response.content)
+
+# Key: The service runs in-process on a port chosen by the OS (port 0). The
+# server is created at import, so its socket is already bound and listening
+# and the URLs below come from its real address. Each pytest-xdist worker gets
+# its own server; the 'service' fixture serves requests on it.
+SERVER = ProductServiceServer(("localhost", 0), ProductServiceHandler)
+SERVICE_PORT = SERVER.server_address[1]
+BASE_URL = f"http://localhost:{SERVICE_PORT}"
+
+# Key: Endpoint URLs, built once instead of formatted in every test
+PRODUCTS_URL = f"{BASE_URL}/products"
+PRODUCT_1_URL = f"{PRODUCTS_URL}/1"
+
+def product_url(product_id):
+    return f"{PRODUCTS_URL}/{product_id}"
+
+# Key: Validation error messages returned by the service
+NAME_ERROR = "Field 'name' is required and must be a non-empty string"
+PRICE_ERROR = "Field 'price' is required and must be a non-negative number"
+
+@pytest.fixture(scope="session", autouse=True)
+def service():
+    # Key: Serve requests for the whole test session. SERVER is already
+    # listening, so no ready-check is needed.
+    thread = threading.Thread(target=SERVER.serve_forever, kwargs={"poll_interval": 0.05},
+                              daemon=True)
+    thread.start()
+    try:
+        yield SERVER
+    finally:
+        SERVER.shutdown()
+        SERVER.server_close()
+
+@pytest.fixture(scope="module")
+def session():
+    # Key: One Session for the whole module, so requests reuse a pooled
+    # keep-alive connection instead of opening a new one each time.
+    s = requests.Session()
+    # The service is local: skip proxy lookups from the environment, don't
+    # retry, and read bodies eagerly so connections return to the pool at once.
+    s.trust_env = False
+    s.stream = False
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=Retry(total=0))
+    s.mount("http://", adapter)
+    s.headers.update({"Content-Type": "application/json", "Accept": "application/json"})
+    # Warm-up: open the pooled connection before the first real test runs
+    try:
+        s.get(PRODUCTS_URL, timeout=2)
+    except requests.RequestException:
+        pass
+    yield s
+    s.close()
+
+# Key: Request bodies used many times are encoded once; the session already
+# sends 'Content-Type: application/json', so they go out as-is via data=
+TEMP_PRODUCT = json.dumps({"name": "Temp", "price": 10}).encode()
+
+def _create_product(session):
+    response = session.post(PRODUCTS_URL, data=TEMP_PRODUCT)
+    assert response.status_code == 201
+    return parse_json(response)["id"]
+
+@pytest.fixture
+def created_product(session):
+    # Key: A fresh product for tests that change or delete it
+    return _create_product(session)
+
+@pytest.fixture(scope="module")
+def shared_product(session):
+    # Key: One product shared by tests that only send rejected (400) updates,
+    # so it is never modified and a single POST serves all of them
+    return _create_product(session)
+
+@pytest.fixture(scope="module")
+def seed_products(session):
+    # Key: The product list is fetched and parsed once per module; tests that
+    # only inspect the seeded data assert on this cached list
+    response = session.get(PRODUCTS_URL)
+    assert response.status_code == 200
+    return parse_json(response)
+
+def test_get_all_products(seed_products):
+    # Key: Smoke test for the collection endpoint
+    """Test the /products endpoint to get all products."""
+    # Check if the response is a list with at least the original 3 items
+    # (the 200 status is checked by the seed_products fixture)
+    assert isinstance(seed_products, list)
+    assert len(seed_products) >= 3
+
+def test_get_one_product_success(session):
+    # Key: Fetch a known product by ID
+    """Test getting a single, existing product by its ID."""
+    response = session.get(PRODUCT_1_URL)
+    
+    # Check for status 200 (OK)
+    assert response.status_code == 200
+    
+    # Check if the product name is correct
+    product = parse_json(response)
+    assert product['name'] == 'Laptop'
+
+def test_get_one_product_not_found(session):
+    # Key: Not-found path should return 404 with error JSON
+    """Test getting a product that does not exist."""
+    response = session.get(product_url(99)) # 99 is a non-existent ID
+    
+    # Check for status 404 (Not Found)
+    assert response.status_code == 404
+    
+    # Check the error message
+    error_data = parse_json(response)
+    assert error_data['error'] == 'Product not found'
+    
+def test_invalid_endpoint(session):
+    # Key: Unknown route should return 404
+    """Test accessing an endpoint that doesn't exist."""
+    response = session.get(f"{BASE_URL}/invalid_path")
+    
+    # Check for status 404 (Not Found)
+    assert response.status_code == 404
+
+def test_create_product(session):
+    # Key: Happy-path creation returns 201 and echoes fields with a new id
+    """Test creating a new product using POST /products."""
+    new_product = {"name": "Headphones", "price": 199}
+    response = session.post(PRODUCTS_URL, json=new_product)
+
+    # Expect 201 Created
+    assert response.status_code == 201
+
+    created = parse_json(response)
+    assert 'id' in created
+    assert created['name'] == new_product['name']
+    assert created['price'] == new_product['price']
+
+def test_create_product_invalid_json(session):
+    # Key: Malformed JSON should be rejected with 400 and clear error
+    """POST /products with invalid JSON should return 400."""
+    response = session.post(PRODUCTS_URL, data="{invalid json}")
+    assert response.status_code == 400
+    assert parse_json(response).get('error') == 'Invalid JSON payload'
+
+# Key: Validation – each case is reported as its own test
+@pytest.mark.parametrize("body,error", [
+    pytest.param(json.dumps({"price": 10}).encode(), NAME_ERROR, id="missing-name"),
+    pytest.param(json.dumps({"name": "   ", "price": 10}).encode(), NAME_ERROR, id="empty-name"),
+    pytest.param(json.dumps({"name": "Item"}).encode(), PRICE_ERROR, id="missing-price"),
+    pytest.param(json.dumps({"name": "Item", "price": "free"}).encode(), PRICE_ERROR, id="non-numeric-price"),
+    pytest.param(json.dumps({"name": "Item", "price": -1}).encode(), PRICE_ERROR, id="negative-price"),
+])
+def test_create_product_validation(session, body, error):
+    """POST /products with an invalid field should return 400."""
+    response = session.post(PRODUCTS_URL, data=body)
+    assert response.status_code == 400
+    assert parse_json(response).get('error') == error
+
+def test_put_update_product(session, created_product):
+    # Key: PUT is a full replacement; requires both fields
+    """Fully update a product via PUT."""
+    put_resp = session.put(product_url(created_product), json={"name": "Updated", "price": 20})
+    assert put_resp.status_code == 200
+    body = parse_json(put_resp)
+    assert body["id"] == created_product
+    assert body["name"] == "Updated"
+    assert body["price"] == 20
+
+def test_put_missing_fields(session, shared_product):
+    # Key: PUT without one of the required fields should be 400
+    """PUT requires both name and price."""
+    resp1 = session.put(product_url(shared_product), json={"name": "OnlyName"})
+    assert resp1.status_code == 400
+    resp2 = session.put(product_url(shared_product), json={"price": 999})
+    assert resp2.status_code == 400
+
+def test_patch_partial_update(session, created_product):
+    # Key: PATCH can update one field at a time
+    """PATCH should allow updating only one field at a time."""
+    patch_resp = session.patch(product_url(created_product), json={"price": 35})
+    assert patch_resp.status_code == 200
+    assert parse_json(patch_resp)["price"] == 35
+
+    patch_resp2 = session.patch(product_url(created_product), json={"name": "Patched"})
+    assert patch_resp2.status_code == 200
+    assert parse_json(patch_resp2)["name"] == "Patched"
+
+# Key: PATCH still validates any provided fields
+@pytest.mark.parametrize("body,error", [
+    pytest.param(json.dumps({"name": "   "}).encode(), NAME_ERROR, id="empty-name"),
+    pytest.param(json.dumps({"price": -5}).encode(), PRICE_ERROR, id="negative-price"),
+    pytest.param(json.dumps({"price": "free"}).encode(), PRICE_ERROR, id="non-numeric-price"),
+])
+def test_patch_validation(session, shared_product, body, error):
+    """PATCH validation for name/price values."""
+    response = session.patch(product_url(shared_product), data=body)
+    assert response.status_code == 400
+    assert parse_json(response).get('error') == error
+
+# Key: A body that is valid JSON but not an object is rejected by every write
+@pytest.mark.parametrize("method", ["POST", "PUT", "PATCH"])
+def test_non_object_body_rejected(session, shared_product, method):
+    """A JSON list body should return 400 instead of an error or a dropped connection."""
+    url = PRODUCTS_URL if method == "POST" else product_url(shared_product)
+    response = session.request(method, url, data=b"[1]")
+    assert response.status_code == 400
+    assert parse_json(response).get('error') == "JSON payload must be an object"
+
+def test_delete_product_success(session, created_product):
+    # Key: DELETE returns the deleted resource; subsequent GET is 404
+    """Delete a product and verify it is gone."""
+    delete_resp = session.delete(product_url(created_product))
+    assert delete_resp.status_code == 200
+    body = parse_json(delete_resp)
+    assert body["id"] == created_product
+
+    # Subsequent GET should be 404
+    get_resp = session.get(product_url(created_product))
+    assert get_resp.status_code == 404
+
+def test_get_reflects_updates(session, created_product):
+    # Key: Cached GET responses must not outlive a write
+    """GET after PUT/PATCH returns the updated product."""
+    # Prime the cache for both endpoints
+    assert parse_json(session.get(product_url(created_product)))["price"] == 10
+    session.get(PRODUCTS_URL)
+
+    session.put(product_url(created_product), json={"name": "Cached", "price": 55})
+    assert parse_json(session.get(product_url(created_product)))["price"] == 55
+
+    session.patch(product_url(created_product), json={"name": "Recached"})
+    assert parse_json(session.get(product_url(created_product)))["name"] == "Recached"
+    names = [p["name"] for p in parse_json(session.get(PRODUCTS_URL))]
+    assert "Recached" in names
+
+def test_patch_invalid_leaves_product_unchanged(session, shared_product):
+    # Key: A rejected PATCH must not apply any of its fields
+    """PATCH with a valid name but invalid price changes nothing."""
+    resp = session.patch(product_url(shared_product), json={"name": "Changed", "price": -1})
+    assert resp.status_code == 400
+    assert parse_json(session.get(product_url(shared_product)))["name"] == "Temp"
+
+def test_deleted_id_not_reused(session, created_product):
+    # Key: New products always get a fresh ID, even after the newest one is deleted
+    """Creating a product after a delete does not reuse the deleted ID."""
+    session.delete(product_url(created_product))
+
+    create_resp2 = session.post(PRODUCTS_URL, json={"name": "Next", "price": 2})
+    assert create_resp2.status_code == 201
+    assert int(parse_json(create_resp2)["id"]) > int(created_product)
+
+def test_concurrent_creates_get_unique_ids():
+    # Key: The service handles requests on several threads; IDs must stay unique
+    """Parallel POSTs each receive a distinct ID."""
+    def create(i):
+        # A Session is not shared across threads, so each call uses its own,
+        # with proxy settings from the environment ignored like the shared one
+        with requests.Session() as s:
+            s.trust_env = False
+            return s.post(PRODUCTS_URL, json={"name": f"Parallel{i}", "price": i})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(create, range(16)))
+
+    assert all(r.status_code == 201 for r in responses)
+    ids = {parse_json(r)["id"] for r in responses}
+    assert len(ids) == 16
+
+def test_keep_alive_connection_reused():
+    # Key: The service speaks HTTP/1.1, so one connection serves several requests
+    """Several requests, including one with an ignored body, share one connection."""
+    conn = http.client.HTTPConnection("localhost", SERVICE_PORT)
+    try:
+        conn.request("POST", "/invalid_path", body=b'{"name": "Ignored"}',
+                     headers={"Content-Type": "application/json"})
+        first = conn.getresponse()
+        first.read()
+        assert first.status == 404
+        assert not first.will_close
+        sock = conn.sock
+
+        conn.request("GET", "/products/1")
+        second = conn.getresponse()
+        assert second.status == 200
+        assert json.loads(second.read())['name'] == 'Laptop'
+        assert conn.sock is sock
+    finally:
+        conn.close()
+
+def _raw_exchange(raw):
+    """Send raw bytes on a new connection and read until the server closes it."""
+    with socket.create_connection(("localhost", SERVICE_PORT), timeout=2) as sock:
+        sock.sendall(raw)
+        chunks = []
+        chunk = sock.recv(65536)
+        while chunk:
+            chunks.append(chunk)
+            chunk = sock.recv(65536)
+    return b"".join(chunks)
+
+# Key: When the body's length can't be trusted, the service must reject the
+# request and close the connection, so the body is never parsed as a request
+@pytest.mark.parametrize("header,status,error", [
+    pytest.param(b"Content-Length: -1", 400, "Invalid Content-Length header", id="negative-length"),
+    pytest.param(b"Content-Length: 1x", 400, "Invalid Content-Length header", id="malformed-length"),
+    pytest.param(b"Transfer-Encoding: chunked", 411,
+                 "Transfer-Encoding is not supported; send Content-Length", id="chunked"),
+])
+def test_untrusted_body_length_closes_connection(session, created_product, header, status, error):
+    """A body hiding a second request must not be executed."""
+    smuggled = f"DELETE /products/{created_product} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode()
+    response = _raw_exchange(b"POST /products HTTP/1.1\r\nHost: localhost\r\n" + header + b"\r\n\r\n" + smuggled)
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 %d " % status)
+    assert b"Connection: close" in head
+    assert _loads(body) == {"error": error}
+    # Only one response came back, and the smuggled DELETE never ran
+    assert session.get(product_url(created_product)).status_code == 200
+
+def test_delete_product_not_found(session):
+    # Key: Deleting a missing product yields 404 with error JSON
+    """Deleting a non-existent product returns 404."""
+    delete_resp = session.delete(product_url(999999))
+    assert delete_resp.status_code == 404
+    assert parse_json(delete_resp).get('error') == 'Product not found'